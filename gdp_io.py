@@ -0,0 +1,132 @@
+# gdp_io.py
+# Chargement des données de PIB, partagé par les pages du dashboard
+import io
+import os
+import tempfile
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from pathlib import Path
+
+# Chemin local vers les données (adaptez-le à votre structure)
+DATA_PATH = Path("data/gdp_data.csv")
+# Copie au format long, régénérée dès que le CSV est plus récent
+PARQUET_PATH = Path("data/gdp_data.parquet")
+# Années couvertes par le fichier de la Banque Mondiale
+MIN_YEAR, MAX_YEAR = 1960, 2022
+
+def _melt_csv():
+    """Lit le CSV et le transforme au format long (wide to long)"""
+    years = np.arange(MIN_YEAR, MAX_YEAR + 1, dtype=np.int16)
+    year_columns = [str(y) for y in years]
+    
+    # Lecture multi-thread limitée aux colonnes utiles
+    df = pd.read_csv(
+        DATA_PATH,
+        engine="pyarrow",
+        usecols=["Country Name", "Country Code", *year_columns],
+        dtype={col: "float32" for col in year_columns}
+    )
+    
+    # Le bloc des années est aplati ligne par ligne : pays puis année
+    values = df.loc[:, year_columns].to_numpy(dtype=np.float32).reshape(-1)
+    return pd.DataFrame({
+        "Country Name": np.repeat(df["Country Name"].to_numpy(), len(years)),
+        "Country Code": np.repeat(df["Country Code"].to_numpy(), len(years)),
+        "Year": np.tile(years, len(df)),
+        "GDP": values
+    })
+
+def _ensure_parquet():
+    """Charge les données au format long depuis le Parquet s'il est à jour"""
+    if PARQUET_PATH.exists() and PARQUET_PATH.stat().st_mtime >= DATA_PATH.stat().st_mtime:
+        try:
+            return pd.read_parquet(
+                PARQUET_PATH,
+                columns=["Country Name", "Country Code", "Year", "GDP"]
+            )
+        except (OSError, pa.ArrowInvalid):
+            # Cache illisible (tronqué, corrompu, autre version de pyarrow) :
+            # on le reconstruit depuis le CSV
+            pass
+    
+    df_melted = _melt_csv()
+    tmp_path = None
+    try:
+        # Écriture dans un fichier temporaire puis renommage atomique : un
+        # Parquet tronqué ne peut pas remplacer le cache
+        fd, tmp_path = tempfile.mkstemp(dir=PARQUET_PATH.parent, suffix=".parquet.tmp")
+        os.close(fd)
+        df_melted.to_parquet(tmp_path, compression="zstd", index=False)
+        # mkstemp crée le fichier en 0600 ; le cache reste lisible comme le CSV
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, PARQUET_PATH)
+    except OSError:
+        # Dossier en lecture seule ou disque plein : on garde simplement le
+        # résultat en mémoire
+        if tmp_path is not None:
+            Path(tmp_path).unlink(missing_ok=True)
+    return df_melted
+
+def data_version():
+    """Date de modification du CSV, utilisée comme clé des caches ci-dessous
+    
+    Passer cette valeur aux fonctions de chargement garantit qu'un CSV mis à
+    jour n'est jamais servi depuis un cache plus ancien, y compris sur disque.
+    Ces caches ne gardent qu'une entrée : l'ancienne version est évincée.
+    """
+    try:
+        return DATA_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        st.error(f"Fichier introuvable : {DATA_PATH}")
+        st.stop()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_raw(version):
+    """Charge le fichier CSV brut (aperçu et téléchargement)"""
+    try:
+        return pd.read_csv(DATA_PATH, engine="pyarrow")
+    except FileNotFoundError:
+        st.error(f"Fichier introuvable : {DATA_PATH}")
+        st.stop()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def raw_csv_bytes(version):
+    """Encode le CSV brut pour le téléchargement, une seule fois"""
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(load_raw(version), preserve_index=False), buffer)
+    return buffer.getvalue()
+
+@st.cache_data(show_spinner=False, persist="disk", max_entries=1)
+def load(version):
+    """Charge le PIB sous forme de matrice pays × années (en milliards USD)
+    
+    Retourne (matrix, codes, names, years), triés par code pays : la ligne i
+    de matrix correspond au pays codes[i] / names[i], la colonne j à
+    years[j]. Le résultat est aussi conservé sur disque par Streamlit d'un
+    démarrage à l'autre ; version (voir data_version) l'invalide dès que le
+    CSV change.
+    """
+    try:
+        df_long = _ensure_parquet().sort_values(
+            ["Country Code", "Year"], kind="stable", ignore_index=True
+        )
+        years = np.arange(MIN_YEAR, MAX_YEAR + 1, dtype=np.int16)
+        matrix = (
+            df_long["GDP"].to_numpy(dtype=np.float32) / np.float32(1e9)
+        ).reshape(-1, len(years))
+        
+        # Une ligne sur len(years) suffit pour retrouver les pays
+        countries = df_long.iloc[::len(years)]
+        codes = countries["Country Code"].to_numpy()
+        names = countries["Country Name"].to_numpy()
+        return matrix, codes, names, years
+    
+    except FileNotFoundError:
+        st.error(f"Fichier introuvable : {DATA_PATH}")
+        st.stop()
+    except Exception as e:
+        st.error(f"Erreur de chargement : {str(e)}")
+        st.stop()
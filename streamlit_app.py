@@ -1,8 +1,11 @@
 # gdp_dashboard.py
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from pathlib import Path
+import numpy as np
+import plotly.graph_objects as go
+
+import gdp_io
+from gdp_io import MIN_YEAR, MAX_YEAR
 
 # Configuration de la page
 st.set_page_config(
@@ -12,35 +15,150 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Chemin local vers les données (adaptez-le à votre structure)
-DATA_PATH = "data/gdp_data.csv"
+# Nombre maximal de points envoyés au navigateur pour chaque courbe
+MAX_POINTS_PER_TRACE = 500
+# Nombre de graphiques gardés en cache (les plus anciens sont évincés)
+FIGURE_CACHE_ENTRIES = 64
+
+def _year_slice(start_year, end_year):
+    """Colonnes de la matrice correspondant à la période"""
+    return slice(start_year - MIN_YEAR, end_year - MIN_YEAR + 1)
 
-@st.cache_data
-def load_data():
-    """Charge les données depuis le fichier local"""
-    try:
-        df = pd.read_csv(DATA_PATH)
+def _lttb(x, y, n_out):
+    """Indices des points conservés par l'algorithme LTTB (Largest Triangle Three Buckets)"""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    # Le premier et le dernier point sont toujours conservés ; les autres
+    # sont répartis dans n_out - 2 paquets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
         
-        # Transformation des données (format wide to long)
-        years = [str(y) for y in range(1960, 2023)]
-        df_melted = df.melt(
-            id_vars=["Country Name", "Country Code", "Indicator Name", "Indicator Code"],
-            value_vars=years,
-            var_name="Year",
-            value_name="GDP"
+        # Point du paquet formant le plus grand triangle avec le point
+        # précédent et la moyenne du paquet suivant
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
         )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def _downsample(x, y, n_out=MAX_POINTS_PER_TRACE):
+    """Réduit une courbe à n_out points au plus avant l'envoi à Plotly"""
+    if len(x) <= n_out:
+        return x, y
+    
+    missing = ~np.isfinite(y)
+    finite = np.flatnonzero(~missing)
+    keep = finite[_lttb(
+        x[finite].astype(np.float64), y[finite].astype(np.float64), n_out
+    )]
+    
+    # Réinsère une coupure (NaN) entre deux points conservés séparés par des
+    # valeurs manquantes, comme pour les courbes non réduites
+    missing_before = np.cumsum(missing)[keep]
+    breaks = np.flatnonzero(np.diff(missing_before) > 0) + 1
+    trace_x = np.insert(x[keep], breaks, x[keep][breaks])
+    trace_y = np.insert(y[keep].astype(np.float64), breaks, np.nan)
+    return trace_x, trace_y
+
+def _country_stats(gdp_matrix):
+    """Croissance totale, croissance annuelle moyenne et volatilité (en %) par pays
+    
+    gdp_matrix est de forme (pays, années) ; les valeurs manquantes sont ignorées
+    dans le calcul de la volatilité.
+    """
+    n_periods = max(gdp_matrix.shape[1] - 1, 1)
+    
+    # Une division vectorielle par indicateur, sur tous les pays à la fois ;
+    # NaN lorsque l'année de référence est manquante ou nulle
+    first, last = gdp_matrix[:, 0], gdp_matrix[:, -1]
+    ratio = np.divide(last, first, out=np.full_like(last, np.nan), where=first > 0)
+    previous = gdp_matrix[:, :-1]
+    yoy = np.divide(
+        gdp_matrix[:, 1:], previous, out=np.full_like(previous, np.nan), where=previous > 0
+    ) - 1.0
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valid = np.isfinite(yoy)
+        count = valid.sum(axis=1)
+        mean = np.where(valid, yoy, 0.0).sum(axis=1) / count
+        variance = np.where(valid, (yoy - mean[:, None]) ** 2, 0.0).sum(axis=1) / count
         
-        df_melted["Year"] = pd.to_numeric(df_melted["Year"])
-        df_melted["GDP (Milliards $)"] = df_melted["GDP"] / 1e9
-        
-        return df, df_melted
-    
-    except FileNotFoundError:
-        st.error(f"Fichier introuvable : {DATA_PATH}")
-        st.stop()
-    except Exception as e:
-        st.error(f"Erreur de chargement : {str(e)}")
-        st.stop()
+        stats = np.empty((gdp_matrix.shape[0], 3), dtype=np.float32)
+        stats[:, 0] = (ratio - 1.0) * 100.0
+        # Pas de croissance annuelle moyenne sur une période d'une seule année
+        stats[:, 1] = (np.power(ratio, 1.0 / n_periods) - 1.0) * 100.0
+        if gdp_matrix.shape[1] < 2:
+            stats[:, 1] = np.nan
+        stats[:, 2] = np.sqrt(variance) * 100.0
+    return stats
+
+def _country_rows(codes, countries):
+    """Lignes de la matrice correspondant aux codes pays (codes triés)"""
+    rows = np.minimum(np.searchsorted(codes, countries), len(codes) - 1)
+    unknown = [code for code, row in zip(countries, rows) if codes[row] != code]
+    if unknown:
+        raise KeyError(f"Codes pays inconnus : {', '.join(unknown)}")
+    return rows
+
+def filter_data(version, countries, start_year, end_year):
+    """Matrice des pays choisis sur la période (simple découpage, non mis en cache)"""
+    matrix, codes, _, _ = gdp_io.load(version)
+    rows = _country_rows(codes, countries)
+    return matrix[rows, _year_slice(start_year, end_year)]
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES)
+def build_figure(version, countries, start_year, end_year, log_scale):
+    """Graphique d'évolution du PIB (mis en cache par sélection)"""
+    _, codes, names, years = gdp_io.load(version)
+    gdp_matrix = filter_data(version, countries, start_year, end_year)
+    x = years[_year_slice(start_year, end_year)]
+    
+    fig = go.Figure()
+    for name, y in zip(names[_country_rows(codes, countries)], gdp_matrix):
+        trace_x, trace_y = _downsample(x, y)
+        fig.add_trace(go.Scattergl(
+            x=trace_x,
+            y=trace_y,
+            mode="lines",
+            name=name
+        ))
+    # Le nom du pays est lu depuis la trace plutôt que répété pour chaque point
+    fig.update_traces(
+        hovertemplate="%{fullData.name}<br>%{x} : %{y:.1f} Md$<extra></extra>"
+    )
+    # Conserve le zoom de l'utilisateur d'une exécution à l'autre
+    fig.update_layout(
+        height=600,
+        uirevision="gdp",
+        xaxis_title="Year",
+        yaxis_title="PIB (en milliards USD)",
+        yaxis_type="log" if log_scale else "linear",
+        legend_title_text="Country Name"
+    )
+    return fig
+
+def _to_long(version, countries, start_year, end_year):
+    """Reconstruit le format long pour l'affichage des données filtrées"""
+    _, codes, names, years = gdp_io.load(version)
+    gdp_matrix = filter_data(version, countries, start_year, end_year)
+    period = years[_year_slice(start_year, end_year)]
+    rows = _country_rows(codes, countries)
+    return pd.DataFrame({
+        "Country Name": np.repeat(names[rows], len(period)),
+        "Year": np.tile(period, len(rows)),
+        "GDP (Milliards $)": gdp_matrix.reshape(-1)
+    })
 
 # Interface utilisateur
 def main():
@@ -50,14 +168,17 @@ def main():
     """)
     
     # Chargement des données
-    raw_df, processed_df = load_data()
+    version = gdp_io.data_version()
+    raw_df = gdp_io.load_raw(version)
+    _, codes, names, _ = gdp_io.load(version)
+    code_to_name = dict(zip(codes, names))
     
     # Section d'exploration
     with st.expander("🔍 Aperçu des données brutes (5 premières lignes)"):
         st.dataframe(raw_df.head(), use_container_width=True)
         st.download_button(
             label="Télécharger les données brutes",
-            data=raw_df.to_csv(index=False).encode('utf-8'),
+            data=gdp_io.raw_csv_bytes(version),
             file_name="gdp_data_raw.csv",
             mime="text/csv"
         )
@@ -66,22 +187,21 @@ def main():
     with st.sidebar:
         st.header("Filtres")
         
-        # Sélection des pays
-        available_countries = processed_df["Country Name"].unique()
+        # Sélection des pays, parmi ceux de la matrice chargée (triés par nom)
         selected_countries = st.multiselect(
             "Pays",
-            options=available_countries,
-            default=["France", "Germany", "United States", "China", "Japan"],
+            options=codes[np.argsort(names)],
+            default=["FRA", "DEU", "USA", "CHN", "JPN"],
+            format_func=code_to_name.get,
             max_selections=10
         )
         
         # Sélection des années
-        min_year = int(processed_df["Year"].min())
-        max_year = int(processed_df["Year"].max())
         year_range = st.slider(
             "Période",
-            min_year, max_year,
-            (2000, max_year)
+            min_value=MIN_YEAR,
+            max_value=MAX_YEAR,
+            value=(2000, MAX_YEAR)
         )
         
         # Options d'affichage
@@ -89,66 +209,66 @@ def main():
         log_scale = st.checkbox("Échelle logarithmique", False)
         show_raw = st.checkbox("Afficher données filtrées", False)
     
-    # Filtrage des données
-    filtered_df = processed_df[
-        (processed_df["Country Name"].isin(selected_countries)) &
-        (processed_df["Year"].between(*year_range))
-    ]
-    
-    if filtered_df.empty:
+    if not selected_countries:
         st.warning("Aucune donnée disponible avec ces filtres")
         return
     
+    # Filtrage des données (clé de cache indépendante de l'ordre de sélection)
+    countries_key = tuple(sorted(selected_countries))
+    gdp_matrix = filter_data(version, countries_key, *year_range)
+    
     # Visualisation principale
     st.header("Évolution du PIB")
-    fig = px.line(
-        filtered_df,
-        x="Year",
-        y="GDP (Milliards $)",
-        color="Country Name",
-        hover_name="Country Name",
-        log_y=log_scale,
-        labels={"GDP (Milliards $)": "PIB (en milliards USD)"}
+    fig = build_figure(version, countries_key, *year_range, log_scale)
+    st.plotly_chart(
+        fig,
+        use_container_width=True,
+        theme=None,
+        config={"staticPlot": False, "responsive": True}
     )
-    fig.update_layout(height=600)
-    st.plotly_chart(fig, use_container_width=True)
     
     # Statistiques comparatives
     st.header("Comparaison entre pays")
     
-    # Calcul des indicateurs
-    pivot_df = filtered_df.pivot_table(
-        index="Country Name",
-        columns="Year",
-        values="GDP (Milliards $)",
-        aggfunc="sum"
-    )
+    # Calcul des indicateurs sur la matrice pays × années : la première et la
+    # dernière colonne correspondent aux bornes de la période
+    prev_year, latest_year = year_range
+    current_gdp = gdp_matrix[:, -1]
+    stats = _country_stats(gdp_matrix)
+    
+    # Positions des pays dans l'ordre de sélection
+    positions = [countries_key.index(code) for code in selected_countries]
     
     # Affichage des métriques
     cols = st.columns(4)
-    for idx, country in enumerate(selected_countries):
+    for idx, pos in enumerate(positions):
+        growth, cagr, volatility = stats[pos]
+        # Les bornes de la période sont lues telles quelles : une valeur
+        # manquante est signalée plutôt que remplacée par une autre année
+        has_current = np.isfinite(current_gdp[pos])
+        has_growth = np.isfinite(growth)
+        
+        # Seuls les indicateurs calculables apparaissent dans l'aide
+        details = [f"De {prev_year} à {latest_year}"]
+        if not has_growth:
+            details.append("PIB non disponible pour l'une des deux années")
+        if np.isfinite(cagr):
+            details.append(f"croissance annuelle moyenne {cagr:.1f}%")
+        if np.isfinite(volatility):
+            details.append(f"volatilité annuelle {volatility:.1f}%")
         with cols[idx % 4]:
-            if country in pivot_df.index:
-                latest_year = pivot_df.columns[-1]
-                prev_year = pivot_df.columns[0]
-                
-                current_gdp = pivot_df.loc[country, latest_year]
-                previous_gdp = pivot_df.loc[country, prev_year]
-                
-                growth = (current_gdp / previous_gdp - 1) * 100
-                
-                st.metric(
-                    label=country,
-                    value=f"{current_gdp:,.0f} Md$",
-                    delta=f"{growth:.1f}%",
-                    help=f"De {prev_year} à {latest_year}"
-                )
+            st.metric(
+                label=code_to_name[countries_key[pos]],
+                value=f"{current_gdp[pos]:,.0f} Md$" if has_current else "n.d.",
+                delta=f"{growth:.1f}%" if has_growth else None,
+                help=" · ".join(details)
+            )
     
     # Données filtrées
     if show_raw:
         st.header("Données filtrées")
         st.dataframe(
-            filtered_df[["Country Name", "Year", "GDP (Milliards $)"]],
+            _to_long(version, countries_key, *year_range),
             column_config={
                 "GDP (Milliards $)": st.column_config.NumberColumn(format="%.2f Md$")
             },